@@ -10,5 +10,8 @@ MP4 = '.mp4'
 MKV = '.mkv'
 SUPPORTED_VIDEO_FORMATS = (MP4, MKV)
 
+# 搜索结果中每部电影最多显示的条数
+DEFAULT_PER_MOVIE_LIMIT = 3
+
 CONFIG_FILE = os.path.expanduser('~/.enchant.json')
 LOG_FILE = os.path.expanduser('~/.enchant.log')
\ No newline at end of file
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import argparse
+import cProfile
+import heapq
 import logging
 import logging.config
+import os
 import pathlib
 import sys
 import traceback
@@ -11,10 +14,12 @@ from datetime import timedelta
 import srt
 
 from enchant.config import load_config
-from enchant.consts import LOG_FILE
+from enchant.consts import DEFAULT_PER_MOVIE_LIMIT, LOG_FILE
 from enchant.exceptions import *
-from enchant.movie import get_movie_by_id, get_movie_by_subtitle_object_id
+from enchant.movie import get_movie_by_id, get_movies_by_subtitle_object_ids
+from enchant.profiling import enable as enable_profiling, report as report_profiling
 from enchant.repo import Repo
+from enchant.search_engine import hit_counts
 from enchant.util import print_and_log
 
 
@@ -41,6 +46,10 @@ def config_log(log_filename):
                 'level': 'DEBUG',
             }
         },
+        'loggers': {
+            # keep module level loggers (e.g. enchant.profiling) enabled
+            'enchant': {},
+        },
         'root': {
             # can enable console for debugging
             'handlers': ['file'],
@@ -70,10 +79,22 @@ def get_repo_or_exit():
 
 DEFAULT_PRE_RESERVED_SECS = 0.5
 DEFAULT_POST_RESERVED_SECS = 2.0
+MAX_MOVIES_IN_HIT_SUMMARY = 10
+
+
+def non_negative_int(value):
+    n = int(value)
+    if n < 0:
+        raise argparse.ArgumentTypeError('must be a non-negative integer: {}'.format(value))
+    return n
 
 
 def init_arg_parser():
     parser = argparse.ArgumentParser(prog='enchant', description='a movie subtitle searcher and video clip maker')
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-stage timing breakdown to stderr after running')
+    parser.add_argument('--profile_dump', metavar='PATH',
+                        help='run under cProfile and dump stats to PATH (readable by pstats)')
     subparsers = parser.add_subparsers(dest='cmd', title='subcommands')
     # cmd init
     parser_init = subparsers.add_parser('init', help='init enchant')
@@ -85,9 +106,11 @@ def init_arg_parser():
     parser_submit.set_defaults(func=cmd_submit)
     # cmd search
     parser_search = subparsers.add_parser('search', help='search some keyword in subtitles')
-    parser_search.add_argument('keyword', help='the word you want to search')
+    parser_search.add_argument('keyword', help='the word you want to search. supports "quoted phrase" and fuzzy term like word~ or word~2')
     parser_search.add_argument('--pagenum', type=int, default=1, help='page number, defaults to 1')
     parser_search.add_argument('--pagelen', type=int, default=15, help='result numbers per page, defaults to 15')
+    parser_search.add_argument('--per_movie', type=non_negative_int, default=DEFAULT_PER_MOVIE_LIMIT,
+                               help='max results per movie, 0 to disable grouping. defaults to {}'.format(DEFAULT_PER_MOVIE_LIMIT))
     parser_search.add_argument('--auto_clip_all', action='store_true',
                                help='automatically make clips for search result')
     parser_search.add_argument('--pre_reserved_secs', type=float, default=DEFAULT_PRE_RESERVED_SECS,
@@ -121,7 +144,7 @@ def main():
         if not args.cmd:
             parser.print_help()
             sys.exit(1)
-        args.func(args)
+        run_cmd(args)
     except EnchantException as e:
         print(e.msg)
         logging.exception(e.msg)
@@ -132,6 +155,33 @@ def main():
         sys.exit(1)
 
 
+def run_cmd(args):
+    if args.profile:
+        enable_profiling()
+    if args.profile_dump:
+        # 提前检查，避免命令跑完才发现无法写入
+        dump_dir = pathlib.Path(args.profile_dump).absolute().parent
+        if not os.access(str(dump_dir), os.W_OK):
+            raise EFileNotFound('无法写入 cProfile 结果，目录不存在或不可写: {}'.format(dump_dir))
+    profiler = cProfile.Profile() if args.profile_dump else None
+    try:
+        if profiler:
+            profiler.runcall(args.func, args)
+        else:
+            args.func(args)
+    finally:
+        if profiler:
+            # 写入失败只记录，不能覆盖命令本身的异常
+            try:
+                profiler.dump_stats(args.profile_dump)
+                logging.info('cProfile stats dumped to %s', args.profile_dump)
+            except OSError:
+                logging.exception('failed to dump cProfile stats to %s', args.profile_dump)
+                print('failed to dump cProfile stats to {}'.format(args.profile_dump), file=sys.stderr)
+        if args.profile:
+            report_profiling()
+
+
 def cmd_init(args):
     """TODO: 看来需要写命令行交互...
     或者用自带的 Tk?"""
@@ -152,7 +202,12 @@ def cmd_submit(args):
 def cmd_search(args):
     repo = get_repo_or_exit()
     keyword, pagenum, pagelen = args.keyword, args.pagenum, args.pagelen
-    respage = repo.search_subtitle(keyword, pagenum, pagelen)
+    respage = repo.search_subtitle(keyword, pagenum, pagelen, args.per_movie)
+    if not respage:
+        suggestion = repo.suggest_query_string(keyword)
+        if suggestion:
+            print_and_log('Nothing found for {}, showing results for {} instead.'.format(keyword, suggestion))
+            respage = repo.search_subtitle(suggestion, pagenum, pagelen, args.per_movie)
     if not respage:
         msg = 'Nothong Found.'
         print_and_log(msg)
@@ -163,10 +218,29 @@ def cmd_search(args):
                 respage.offset + 1, respage.offset + respage.pagelen, respage.total)
     print_and_log(msg)
 
+    counts = hit_counts(respage)
+    top_counts = heapq.nlargest(MAX_MOVIES_IN_HIT_SUMMARY, counts.items(), key=lambda kv: kv[1])
+    with repo.db.connect() as conn:
+        # 一次查出摘要和本页结果涉及的所有电影
+        subtitle_object_ids = {object_id for object_id, _ in top_counts} | {item['object_id'] for item in respage}
+        movies = get_movies_by_subtitle_object_ids(conn, subtitle_object_ids)
+
+    print_and_log('hits per movie:')
+    for subtitle_object_id, count in top_counts:
+        # 索引提交先于 create_movie，可能存在没有对应电影的字幕
+        movie = movies.get(subtitle_object_id)
+        print_and_log('{:>6} {}'.format(count, movie.name if movie else subtitle_object_id))
+    if len(counts) > len(top_counts):
+        print_and_log('   ... and {} more movies'.format(len(counts) - len(top_counts)))
+    print_and_log('')
+
     for item in respage:
         subtitle_object_id = item['object_id']
         start, end, content = item['start'], item['end'], item['content']
-        movie = get_movie_by_subtitle_object_id(repo.db.connect(), subtitle_object_id)
+        movie = movies.get(subtitle_object_id)
+        if movie is None:
+            logging.warning('movie not found for subtitle object %s', subtitle_object_id)
+            continue
 
         print_and_log('{} {}-->{} {}'.format(content.replace('\n', ' '), start, end, movie.name))
         clip_cmd = 'CMD: enchant clip --start {} --end {} --video_object_id {}'\
@@ -177,7 +251,9 @@ def cmd_search(args):
     if args.auto_clip_all:
         print_and_log('automatically make clips for search result:')
         for item in respage:
-            movie = get_movie_by_subtitle_object_id(repo.db.connect(), item['object_id'])
+            movie = movies.get(item['object_id'])
+            if movie is None:
+                continue
             start = srt.srt_timestamp_to_timedelta(item['start'])
             end = srt.srt_timestamp_to_timedelta(item['end'])
             repo.clip_video_and_subtitle(movie.video_object_id, start, end,
@@ -3,6 +3,8 @@
 from sqlalchemy import MetaData, Table, Column, DateTime, Integer, String
 from datetime import datetime
 
+from enchant.profiling import span
+
 metadata = MetaData()
 
 
@@ -15,18 +17,28 @@ Movie = Table('movie', metadata,
     Column('created_at', DateTime, nullable=False)
 )
 
+@span('movie.get_movie_by_id')
 def get_movie_by_id(conn, movie_id):
     sql = Movie.select().where(Movie.c.id == movie_id)
     return conn.execute(sql).fetchone()
 
+@span('movie.get_movie_by_subtitle_object_id')
 def get_movie_by_subtitle_object_id(conn, subtitle_object_id):
     sql = Movie.select().where(Movie.c.subtitle_object_id == subtitle_object_id)
     return conn.execute(sql).fetchone()
 
+@span('movie.get_movies_by_subtitle_object_ids')
+def get_movies_by_subtitle_object_ids(conn, subtitle_object_ids) -> dict:
+    """subtitle_object_id -> movie, ids without a movie row are absent."""
+    sql = Movie.select().where(Movie.c.subtitle_object_id.in_(list(subtitle_object_ids)))
+    return {movie.subtitle_object_id: movie for movie in conn.execute(sql)}
+
+@span('movie.get_movie_by_video_object_id')
 def get_movie_by_video_object_id(conn, video_object_id):
     sql = Movie.select().where(Movie.c.video_object_id == video_object_id)
     return conn.execute(sql).fetchone()
 
+@span('movie.create_movie')
 def create_movie(conn, name, video_object_id, subtitle_object_id, subtitle_format):
     sql = Movie.insert().values(name=name,
                                 video_object_id=video_object_id,
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('enchant.profiling')
+
+# stage -> [count, self_secs]。仅在 enable() 之后才收集，默认关闭。
+_stats = None
+# 当前打开的 span 各自累计的子 span 耗时，用于从父 span 中扣除
+_child_secs = []
+
+
+def enable():
+    """start collecting per-stage timings for report()."""
+    global _stats
+    _stats = {}
+    logger.setLevel(logging.DEBUG)
+
+
+def disable():
+    """stop collecting and drop collected timings."""
+    global _stats
+    _stats = None
+    logger.setLevel(logging.NOTSET)
+
+
+def is_enabled() -> bool:
+    return _stats is not None
+
+
+@contextmanager
+def span(stage):
+    """time a stage, usable as a context manager or a decorator.
+
+    每次结束时写一条 DEBUG 日志（附带 stage/elapsed/self 字段），profiling 开启时
+    将 self 耗时（扣除嵌套子 span 后）累计到 _stats。两者都关闭时直接 yield，
+    几乎没有开销。
+    """
+    if _stats is None and not logger.isEnabledFor(logging.DEBUG):
+        yield
+        return
+
+    _child_secs.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        self_secs = elapsed - _child_secs.pop()
+        if _child_secs:
+            _child_secs[-1] += elapsed
+        if _stats is not None:
+            stat = _stats.setdefault(stage, [0, 0.0])
+            stat[0] += 1
+            stat[1] += self_secs
+        logger.debug('span stage=%s elapsed_ms=%.3f self_ms=%.3f', stage, elapsed * 1000, self_secs * 1000,
+                     extra={'stage': stage, 'elapsed': elapsed, 'self': self_secs})
+
+
+def report(file=sys.stderr):
+    """print per-stage breakdown, slowest stage first.
+    times are exclusive (self time): time spent in nested spans is counted only
+    in the inner stage, so the column sums to no more than the wall time.
+    """
+    if not _stats:
+        return
+    print('{:<32} {:>8} {:>12} {:>12}'.format('stage', 'calls', 'self(ms)', 'avg(ms)'), file=file)
+    for stage, (count, total) in sorted(_stats.items(), key=lambda kv: kv[1][1], reverse=True):
+        print('{:<32} {:>8} {:>12.3f} {:>12.3f}'.format(stage, count, total * 1000, total * 1000 / count),
+              file=file)
@@ -17,10 +17,11 @@ from enchant.consts import *
 from enchant.exceptions import *
 from enchant.movie import create_movie, metadata, \
     get_movie_by_subtitle_object_id, get_movie_by_video_object_id
+from enchant.profiling import span
 from enchant.util import file_to_utf8, print_and_log, ffmpeg_timedelta
 from enchant.storage import open_object, save_object, object_exists, gen_path
 from enchant.search_engine import get_or_create_subtitle_index,\
-    index_subtitle, search_subtitle
+    index_subtitle, search_subtitle, suggest_query_string
 
 
 class Repo(object):
@@ -94,11 +95,16 @@ class Repo(object):
         index_subtitle(index_writer, subtitle_object_id, file, ext)
         return subtitle_object_id, ext
 
-    def search_subtitle(self, query_string, pagenum=1, pagelen=15) -> ResultsPage:
+    def search_subtitle(self, query_string, pagenum=1, pagelen=15,
+                        per_movie_limit=DEFAULT_PER_MOVIE_LIMIT) -> ResultsPage:
         index = get_or_create_subtitle_index(self.index_dir)
-        res = search_subtitle(index, query_string, pagenum, pagelen)
+        res = search_subtitle(index, query_string, pagenum, pagelen, per_movie_limit)
         return res
 
+    def suggest_query_string(self, query_string):
+        index = get_or_create_subtitle_index(self.index_dir)
+        return suggest_query_string(index, query_string)
+
     def adjust_start_and_end(self, start: timedelta, end: timedelta,
                              pre_reserved_secs: timedelta,
                              post_reserved_secs: timedelta):
@@ -150,11 +156,12 @@ class Repo(object):
                                video_clip_path=video_clip_path)
 
         print_and_log('executing: {}'.format(ffmpeg))
-        proc = subprocess.run(ffmpeg.split(' '),
-                              stdout=subprocess.PIPE,
-                              stderr=subprocess.STDOUT,
-                              encoding='utf-8',
-                              check=True)
+        with span('repo.ffmpeg'):
+            proc = subprocess.run(ffmpeg.split(' '),
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT,
+                                  encoding='utf-8',
+                                  check=True)
         logging.info(proc.stdout)
 
     def _clip_subtitle(self, movie: RowProxy, start: timedelta, end: timedelta, video_clip_path):
@@ -5,23 +5,27 @@ from typing import Iterable
 
 import ass
 import srt
-from whoosh import index
+from whoosh import collectors, index, sorting
 from whoosh.fields import *
-from whoosh.qparser import QueryParser
+from whoosh.qparser import FuzzyTermPlugin, QueryParser
 from whoosh.searching import ResultsPage
 
 from enchant.consts import *
 from enchant.exceptions import ESubtitleFormatNotSupported
+from enchant.profiling import span
 
-subtitle_schema = Schema(object_id=ID(stored=True),  # subtitle object id
+# object_id sortable: 按字幕文件分组/折叠时直接读列，无需反查倒排表
+# content spelling: 生成词图，用于拼写纠错
+subtitle_schema = Schema(object_id=ID(stored=True, sortable=True),  # subtitle object id
                          start=ID(stored=True),  # start time, str, like 01:23:04,000
                          end=ID(stored=True),    # end time, str, like 01:23:08,000
-                         content=TEXT(stored=True),
+                         content=TEXT(stored=True, spelling=True),
                          idx=NUMERIC(stored=True))    # index
 
 SUBTITLE_INDEX_NAME = 'index_subtitles'
 
 
+@span('search_engine.open_index')
 def get_or_create_subtitle_index(index_dir):
     # make sure directory exist
     if not pathlib.Path(index_dir).exists():
@@ -55,20 +59,73 @@ def index_subtitle(index_writer, object_id, file, format):
         raise ESubtitleFormatNotSupported(format)
 
     try:
-        if format == SRT:
-            subtitles = srt.parse(file)
-            _index_srt(index_writer, object_id, subtitles)
-        else:
-            doc = ass.parse(file)
-            _index_ass(index_writer, object_id, doc.events)
-        index_writer.commit()
+        with span('search_engine.add_documents'):
+            if format == SRT:
+                subtitles = srt.parse(file)
+                _index_srt(index_writer, object_id, subtitles)
+            else:
+                doc = ass.parse(file)
+                _index_ass(index_writer, object_id, doc.events)
+        with span('search_engine.commit'):
+            index_writer.commit()
     except Exception as e:
         index_writer.cancel()
         raise e
 
 
-def search_subtitle(subtitle_index, query_string, pagenum=1, pagelen=10) -> ResultsPage:
-    """pagenum starts at 1."""
-    qp = QueryParser("content", subtitle_index.schema)
-    query = qp.parse(query_string)
-    return subtitle_index.searcher().search_page(query, pagenum, pagelen)
\ No newline at end of file
+def _parse_query(schema, query_string):
+    """besides plain words, supports "quoted phrase" and fuzzy term like word~ or word~2"""
+    qp = QueryParser("content", schema)
+    qp.add_plugin(FuzzyTermPlugin())
+    return qp.parse(query_string)
+
+
+@span('search_engine.search')
+def search_subtitle(subtitle_index, query_string, pagenum=1, pagelen=10,
+                    per_movie_limit=DEFAULT_PER_MOVIE_LIMIT) -> ResultsPage:
+    """pagenum starts at 1.
+    每部电影（字幕文件）最多保留 per_movie_limit 条结果，<= 0 则不折叠。
+    各字幕文件的命中总数由 collector 分组统计，见 hit_counts()。
+    """
+    query = _parse_query(subtitle_index.schema, query_string)
+    facet = sorting.FieldFacet('object_id')
+    # 关闭 quality 优化，不跳过低分的块，否则分组计数会漏掉文档
+    collector = collectors.TopCollector(limit=pagenum * pagelen, usequality=False)
+    collector = collectors.FacetCollector(collector, {'object_id': facet}, maptype=sorting.Count)
+    if per_movie_limit > 0:
+        # CollapseCollector 驱动整个匹配过程，必须在最外层
+        collector = collectors.CollapseCollector(collector, facet, limit=per_movie_limit)
+    subtitle_index.searcher().search_with_collector(query, collector)
+    results = collector.results()
+    if per_movie_limit > 0:
+        # CollapseCollector.count() 没有扣除交给 child 后又被替换掉的文档，会偏大。
+        # 折叠后每部电影实际保留 min(命中数, limit) 条，据此修正总数，
+        # ResultsPage 的 pagecount 及 pagenum 的截断都依赖它。
+        results._total = sum(min(count, per_movie_limit) for count in _hit_counts(results).values())
+    return ResultsPage(results, pagenum, pagelen)
+
+
+def hit_counts(respage: ResultsPage) -> dict:
+    """subtitle object_id -> hit count, including hits dropped by collapsing.
+    被折叠的文档要么从未交给 FacetCollector（计入 collapsed_counts），
+    要么交给过它后又被更高分的替换（已计入分组），两者相加即为总数。
+    """
+    return _hit_counts(respage.results)
+
+
+def _hit_counts(results) -> dict:
+    counts = dict(results.groups('object_id'))
+    for object_id, count in getattr(results, 'collapsed_counts', {}).items():
+        counts[object_id] = counts.get(object_id, 0) + count
+    return counts
+
+
+@span('search_engine.suggest')
+def suggest_query_string(subtitle_index, query_string):
+    """return spelling corrected query string, or None if there is nothing to correct."""
+    query = _parse_query(subtitle_index.schema, query_string)
+    with subtitle_index.searcher() as searcher:
+        corrected = searcher.correct_query(query, query_string)
+    if corrected.query == query:
+        return None
+    return corrected.string
\ No newline at end of file
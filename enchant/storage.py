@@ -5,7 +5,10 @@ import shutil
 
 from pathlib import Path
 
+from enchant.profiling import span
 
+
+@span('storage.gen_object_id')
 def gen_object_id(file_path) -> str:
     """calculate object_id (akka sha1 sum) from file"""
     sha1 = hashlib.sha1()
@@ -37,7 +40,8 @@ def save_object(storage_dir, file_path) -> str:
     object_path = gen_path(storage_dir, object_id)
     if not object_path.parent.exists():
         object_path.parent.mkdir(parents=True)
-    shutil.copyfile(file_path, object_path)
+    with span('storage.copy'):
+        shutil.copyfile(file_path, object_path)
     return object_id
 
 
@@ -6,7 +6,10 @@ import os.path
 import tempfile
 from datetime import timedelta
 
+from enchant.profiling import span
 
+
+@span('util.detect_encoding')
 def detect_encoding(file_path):
     raw = open(file_path, 'rb').read()
     res = chardet.detect(raw)
@@ -17,6 +20,7 @@ def detect_encoding(file_path):
     return res['encoding']
 
 
+@span('util.file_to_utf8')
 def file_to_utf8(file_path):
     """convert file encoding to utf-8 and newline to OS default line separator.
     It creates a tmp file, writes utf-8 encoded content into it, and returns\
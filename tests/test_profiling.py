@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import logging
+import time
+
+import pytest
+
+from enchant import profiling
+from enchant.profiling import span
+
+
+@pytest.fixture
+def enabled():
+    profiling.enable()
+    yield
+    profiling.disable()
+
+
+def test_nested_span_records_self_time(enabled):
+    with span('outer'):
+        time.sleep(0.01)
+        with span('inner'):
+            time.sleep(0.05)
+
+    outer_count, outer_self = profiling._stats['outer']
+    inner_count, inner_self = profiling._stats['inner']
+    assert outer_count == inner_count == 1
+    assert inner_self >= 0.05
+    assert 0.01 <= outer_self < 0.05
+    assert profiling._child_secs == []
+
+
+def test_span_as_decorator_counts_calls(enabled):
+    @span('work')
+    def work():
+        return 'done'
+
+    assert work() == 'done'
+    work()
+    work()
+    assert profiling._stats['work'][0] == 3
+
+    out = io.StringIO()
+    profiling.report(out)
+    assert 'work' in out.getvalue()
+
+
+def test_nothing_collected_when_off(caplog):
+    profiling.disable()
+    caplog.set_level(logging.INFO, logger='enchant.profiling')
+    with span('idle'):
+        pass
+    assert not profiling.is_enabled()
+    assert profiling._child_secs == []
+    assert caplog.records == []
+
+
+def test_debug_record_carries_extras(caplog):
+    profiling.disable()
+    caplog.set_level(logging.DEBUG, logger='enchant.profiling')
+    with span('outer'):
+        with span('inner'):
+            pass
+
+    records = {r.stage: r for r in caplog.records if r.name == 'enchant.profiling'}
+    assert set(records) == {'outer', 'inner'}
+    outer = records['outer']
+    assert outer.elapsed >= outer.self >= 0
+    assert outer.elapsed >= records['inner'].elapsed
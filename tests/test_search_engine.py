@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+from datetime import timedelta
+
+import pytest
+import srt
+from whoosh import index
+from whoosh.fields import Schema, ID, TEXT, NUMERIC
+
+from enchant.consts import SRT
+from enchant.search_engine import SUBTITLE_INDEX_NAME, get_or_create_subtitle_index, \
+    hit_counts, index_subtitle, search_subtitle, suggest_query_string
+
+A = 'a' * 40
+B = 'b' * 40
+
+# schema before object_id became sortable and content got a spelling graph
+old_subtitle_schema = Schema(object_id=ID(stored=True),
+                             start=ID(stored=True),
+                             end=ID(stored=True),
+                             content=TEXT(stored=True),
+                             idx=NUMERIC(stored=True))
+
+
+def make_srt(n, tmpl):
+    # 越靠后的字幕越短、得分越高，使 CollapseCollector 走替换（child.remove）分支
+    return srt.compose([srt.Subtitle(i + 1, timedelta(seconds=i), timedelta(seconds=i + 1),
+                                     tmpl.format(i) + ' filler' * (n - i))
+                        for i in range(n)])
+
+
+def fill(subtitle_index):
+    index_subtitle(subtitle_index.writer(), A, io.StringIO(make_srt(50, 'hello world {}')), SRT)
+    index_subtitle(subtitle_index.writer(), B, io.StringIO(make_srt(5, 'hello there {}')), SRT)
+    return subtitle_index
+
+
+@pytest.fixture(params=['new', 'old'])
+def subtitle_index(request, tmp_path):
+    if request.param == 'old':
+        index.create_in(str(tmp_path), old_subtitle_schema, SUBTITLE_INDEX_NAME)
+    return fill(get_or_create_subtitle_index(str(tmp_path)))
+
+
+@pytest.mark.parametrize('per_movie', [0, 1, 3, -1])
+def test_hit_counts_include_collapsed_hits(subtitle_index, per_movie):
+    respage = search_subtitle(subtitle_index, 'hello', 1, 4, per_movie)
+    assert hit_counts(respage) == {A: 50, B: 5}
+
+
+@pytest.mark.parametrize('per_movie', [1, 3])
+def test_collapse_limits_hits_per_movie(subtitle_index, per_movie):
+    respage = search_subtitle(subtitle_index, 'hello', 1, 100, per_movie)
+    object_ids = [hit['object_id'] for hit in respage]
+    assert object_ids.count(A) == per_movie
+    assert object_ids.count(B) == per_movie
+
+
+def test_collapsed_total_and_pages(subtitle_index):
+    respage = search_subtitle(subtitle_index, 'hello', 1, 4, 3)
+    # 确认替换分支确实发生过：被替换的文档不计入 collapsed_counts
+    assert sum(respage.results.collapsed_counts.values()) < 55 - 6
+    assert (respage.total, respage.pagecount, len(list(respage))) == (6, 2, 4)
+
+    page2 = search_subtitle(subtitle_index, 'hello', 2, 4, 3)
+    assert (page2.total, page2.pagecount, page2.pagenum) == (6, 2, 2)
+    assert (page2.offset, page2.pagelen, len(list(page2))) == (4, 2, 2)
+
+    past_end = search_subtitle(subtitle_index, 'hello', 5, 4, 3)
+    assert (past_end.pagenum, past_end.offset) == (2, 4)
+    assert [hit.docnum for hit in past_end] == [hit.docnum for hit in page2]
+
+    # 每部电影保留的是得分最高（最短）的几条
+    hits = list(respage) + list(page2)
+    assert sorted(hit['idx'] for hit in hits if hit['object_id'] == A) == [48, 49, 50]
+    assert sorted(hit['idx'] for hit in hits if hit['object_id'] == B) == [3, 4, 5]
+
+
+def test_uncollapsed_total(subtitle_index):
+    respage = search_subtitle(subtitle_index, 'hello', 2, 4, 0)
+    assert (respage.total, respage.pagecount, len(list(respage))) == (55, 14, 4)
+
+
+def test_phrase_and_fuzzy(subtitle_index):
+    assert hit_counts(search_subtitle(subtitle_index, '"hello world"')) == {A: 50}
+    assert hit_counts(search_subtitle(subtitle_index, 'thre~')) == {B: 5}
+
+
+def test_suggest_query_string(subtitle_index):
+    assert suggest_query_string(subtitle_index, 'wrld') == 'world'
+    assert suggest_query_string(subtitle_index, 'world') is None